@@ -1,13 +1,15 @@
-DIRECTIONS = [
-    "north",
-    "northeast",
-    "east",
-    "southeast",
-    "south",
-    "southwest",
-    "west",
-    "northwest",
-]
+DIRECTIONS = frozenset(
+    {
+        "north",
+        "northeast",
+        "east",
+        "southeast",
+        "south",
+        "southwest",
+        "west",
+        "northwest",
+    }
+)
 DIRECTION_ALIASES = {
     "n": "north",
     "ne": "northeast",
@@ -18,3 +20,5 @@ DIRECTION_ALIASES = {
     "w": "west",
     "nw": "northwest",
 }
+# Maps every accepted direction token, full or alias, to its full direction
+DIRECTION_NORMALIZE = dict(zip(DIRECTIONS, DIRECTIONS)) | DIRECTION_ALIASES
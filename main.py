@@ -1,6 +1,8 @@
-from random import randint, choice
-from typing import Callable, Optional, Any
+import sys
+from random import randint, choice, random
+from typing import Callable, FrozenSet, Optional, Set, Tuple
 
+import utils
 from definitions import *
 from utils import *
 
@@ -12,18 +14,24 @@ LOCK_MODULE_ENERGY = 20
 
 # Available commands handling
 available_commands: Dict[str, Callable] = {}
+command_num_args: Dict[str, int] = {}
 command_helps: List[str] = []
 
 
-def get_dialogue(key: str) -> str:
-    return choice(dialogue[key])
+def get_dialogue(key: str, _random: Callable[[], float] = random) -> str:
+    """Return a random variation of a line of dialogue."""
+    variations = dialogue[key]
+    return variations[int(_random() * len(variations))]
 
 
-def command(word: str) -> Callable:
-    """Register a command."""
+def command(word: str, num_args: int = 0) -> Callable:
+    """Register a command, which requires at least num_args arguments."""
+
+    word = sys.intern(word)
 
     def wrap(func: Callable) -> Callable:
         available_commands[word] = func
+        command_num_args[word] = num_args
         if func.__doc__ is not None:
             command_helps.append(func.__doc__)
         return func
@@ -37,15 +45,15 @@ def quit_game(_) -> None:
     if yes_or_no("Are you sure you want to quit? Your progress will be lost."):
         quit()
     else:
-        cprint("Quit cancelled.")
+        utils.cprint("Quit cancelled.")
 
 
 @command("commands")
 def list_available_commands(_) -> None:
     """commands: List the available commands."""
-    cprint("You can use these commands:")
+    utils.cprint("You can use these commands:")
     for command_help in command_helps:
-        cprint(" - " + command_help, long_delay=0.02)
+        utils.cprint(" - " + command_help, long_delay=0.02)
 
 
 @command("doors")
@@ -62,48 +70,44 @@ def debug(_) -> None:
 @command("modules")
 def list_modules(_) -> None:
     """modules: List the modules in the station."""
-    cprint("These modules are in the station:")
-    for module_id in station.modules:
-        module = ModuleInterface(module_id)
-        cprint(f" - {module.title} ({module_id})")
+    utils.cprint("These modules are in the station:")
+    for module_id, module in station.modules.items():
+        utils.cprint(f" - {module.title} ({module_id})")
 
 
-@command("go")
+@command("go", num_args=1)
 def go_in_direction(args: List[str]) -> bool:
     """go [direction] e.g. northeast/ne: Go through a door."""
-    direction: str = args[0]
-    if direction in DIRECTION_ALIASES:
-        direction = DIRECTION_ALIASES[direction]
-    if direction not in DIRECTIONS:
-        cprint(f"You remember that '{direction}' is not a compass direction.")
+    direction: Optional[str] = DIRECTION_NORMALIZE.get(args[0])
+    if direction is None:
+        utils.cprint(f"You remember that '{args[0]}' is not a compass direction.")
         return False
-    try:
-        player.move_to(ModuleInterface(player.module.doors[direction]), introduce=True)
-        return True
-    except KeyError:
-        cprint("You bump into the wall.")
+    module = player.module.doors.get(direction)
+    if module is None:
+        utils.cprint("You bump into the wall.")
         player.module.print_doors()
         return False
+    player.move_to(module, introduce=True)
+    return True
 
 
-@command("lock")
+@command("lock", num_args=1)
 def lock_module(args: List[str]) -> bool:
     """lock [module id] e.g. bridge: Lock a module."""
-    try:
-        module = ModuleInterface(args[0])
-    except AssertionError:
-        cprint(f"No such module '{args[0]}', enter `modules` to list them.")
+    module = station.modules.get(args[0])
+    if module is None:
+        utils.cprint(f"No such module '{args[0]}', enter `modules` to list them.")
         return False
-    if module == player.locked_module:
-        cprint("Module is already locked.")
+    if module is player.locked_module:
+        utils.cprint("Module is already locked.")
         return False
     if station._energy >= LOCK_MODULE_ENERGY:
         player.locked_module = module
         station.deplete_energy(LOCK_MODULE_ENERGY)
-        cprint(f"Successfully locked the {module.title}.")
+        utils.cprint(f"Successfully locked the {module.title}.")
         return True
     else:
-        cprint(f"Insufficient energy to lock the module.")
+        utils.cprint(f"Insufficient energy to lock the module.")
         return False
 
 
@@ -113,99 +117,90 @@ def stats(_) -> None:
     player.print_stats()
 
 
-class ModuleInterface(object):
-    """Allows referencing a module directly instead of by indexing the global
-    list of modules. Raises an assertion error if it is attempted to be created
-    for a module that does not exist."""
-
-    def __init__(self, module_id: str) -> None:
-        assert module_id in list(station.modules.keys())
-        object.__setattr__(self, "module_id", module_id)
-
-    def __getattribute__(self, name: str) -> Any:
-        return station.modules[
-            object.__getattribute__(self, "module_id")
-        ].__getattribute__(name)
-
-    def __setattr__(self, name: str, value: Any) -> None:
-        station.modules[object.__getattribute__(self, "module_id")].__setattr__(
-            name, value
-        )
-
-    def __eq__(self, other: Any) -> bool:
-        # Two ModuleInterfaces are equal if they point to the same module
-        if isinstance(other, self.__class__):
-            return object.__getattribute__(
-                self, "module_id"
-            ) == object.__getattribute__(other, "module_id")
-        # A ModuleInterface is equal to a string if it's the module id it points to
-        elif isinstance(other, str):
-            return object.__getattribute__(self, "module_id") == other
-        else:
-            return False
-
-    def __ne__(self, other: Any) -> bool:
-        return not self == other
-
-
-def random_module(exclude: Optional[List[ModuleInterface]] = None) -> ModuleInterface:
+def random_module(exclude: Optional[List["Module"]] = None) -> "Module":
     """Return a random module, optionally excluding some of them."""
-    if exclude is None:
-        exclude = []
-    return ModuleInterface(
-        choice(
-            [
-                module_id
-                for module_id in station.modules.keys()
-                if ModuleInterface(module_id) not in exclude
-            ]
-        )
-    )
+    module_choices = station.module_choices
+    if not exclude:
+        return choice(module_choices)
+    excluded = set(exclude)
+    if excluded.issuperset(module_choices):
+        raise ValueError("Cannot choose a module when all of them are excluded.")
+    # Only a few modules are ever excluded, so resample rather than filter
+    while True:
+        module = choice(module_choices)
+        if module not in excluded:
+            return module
 
 
 class Module:
     """Space station module."""
 
-    def __init__(self, title: str, description: str, doors: Dict[str, str]) -> None:
+    def __init__(
+        self, module_id: str, title: str, description: str, doors: Dict[str, str]
+    ) -> None:
+        self.module_id: str = module_id
         self.title: str = title
         self.description: str = description
-        self.doors: Dict[str, str] = doors
+        # Module ids are resolved to modules by SpaceStation once all are loaded
+        self.doors: Dict[str, Module] = doors
+        self.neighbours: List[Module] = []
+        self.neighbour_set: FrozenSet[Module] = frozenset()
+        self._doors_sentence: str = (
+            f"There is a door on the {sent_concat(list(doors))} "
+            f"side{'s' if len(doors) != 1 else ''}."
+        )
         self.visited_by_player: bool = False
         self.telium_visited_recently: bool = False
-        self.entities: List[Entity] = []
+        self.entities: Set[Entity] = set()
+        # Entities to notify when the player enters, an ordered set by arrival
+        self.observers: Dict[Entity, None] = {}
+        self.hostiles: List[WorkerAlien] = []
 
     def introduce(self) -> None:
         """Introduce the module. Print the title, the description
         (if not already visited) and the doors."""
         # Title
-        cprint(get_dialogue("enter_module").format(title=self.title))
+        lines = [get_dialogue("enter_module").format(title=self.title)]
         # Module description if not already seen
         if not self.visited_by_player:
-            cprint(self.description)
+            lines.append(self.description)
         # Doors
-        self.print_doors()
+        lines.append(self._doors_sentence)
+        utils.cprint("\n".join(lines))
 
     def print_doors(self) -> None:
         """Print the doors of the module."""
-        cprint("There is a door on the", end=" ")
-        cprint(sent_concat(list(self.doors)), end=" ")
-        cprint(f"side{'s'[:len(self.doors)^1]}.")
+        utils.cprint(self._doors_sentence)
 
 
 class Entity:
     """An entity that has a physical presence in a module."""
 
-    def __init__(self, initial_module: ModuleInterface) -> None:
-        entities.append(self)
-        self.module: ModuleInterface = initial_module
-        self.module.entities.append(self)
-        self.previous_module: Optional[ModuleInterface] = None
+    OBSERVES_PLAYER = True
 
-    def _set_module(self, module: ModuleInterface) -> None:
-        self.module.entities.remove(self)
+    def __init__(self, initial_module: Module) -> None:
+        entities.append(self)
+        self.module: Module = initial_module
+        self._enter_module()
+        self.previous_module: Optional[Module] = None
+
+    def _enter_module(self) -> None:
+        """Add the entity to the current module's entity lists."""
+        self.module.entities.add(self)
+        if self.OBSERVES_PLAYER:
+            self.module.observers[self] = None
+
+    def _leave_module(self) -> None:
+        """Remove the entity from the current module's entity lists."""
+        self.module.entities.discard(self)
+        if self.OBSERVES_PLAYER:
+            self.module.observers.pop(self, None)
+
+    def _set_module(self, module: Module) -> None:
+        self._leave_module()
         self.previous_module = self.module
         self.module = module
-        self.module.entities.append(self)
+        self._enter_module()
 
     def on_player_entered_module(self) -> None:
         pass
@@ -219,49 +214,51 @@ class HasHealth:
     def hurt(self, attack: int) -> None:
         """Decrement health by attack and check if this results in the entity dying."""
         # Prevent negative health.
-        if self._health - attack > 0:
-            self._health -= attack
-        else:
-            self._health = 0
-        logger.log(
-            f"{unique_name(self)} took {attack} damage, now at {self._health} health.",
-            LogLevel.VERBOSE,
-        )
-        if self._health == 0:
+        self._health = max(0, self._health - attack)
+        if logger.verbose_on:
+            logger.log(
+                f"{unique_name(self)} took {attack} damage, now at {self._health} health.",
+                LogLevel.VERBOSE,
+            )
+        if self._health == 0 and self.alive:
             self.alive = False
-            logger.log(f"{unique_name(self)} died.")
+            if logger.info_on:
+                logger.log(f"{unique_name(self)} died.")
 
 
 class Player(Entity, HasHealth):
-    def __init__(self, initial_module: ModuleInterface) -> None:
+    OBSERVES_PLAYER = False
+
+    def __init__(self, initial_module: Module) -> None:
         Entity.__init__(self, initial_module)
         HasHealth.__init__(self, 100)
         self.flamethrower_fuel: int = 100
-        self.locked_module: Optional[ModuleInterface] = None
+        self.locked_module: Optional[Module] = None
 
-    def move_to(self, module: ModuleInterface, introduce: bool = False) -> None:
+    def move_to(self, module: Module, introduce: bool = False) -> None:
         self._set_module(module)
         if introduce:
             self.module.introduce()
         self.module.visited_by_player = True
-        non_player_entities = [
-            entity for entity in self.module.entities if not isinstance(entity, Player)
-        ]
-        module_entity_names = [unique_name(entity) for entity in non_player_entities]
-        logger.log(f"Other entities in this module: {module_entity_names}")
+        # Copy as observers can leave the module when called
+        observers: List[Entity] = list(self.module.observers)
+        if logger.info_on:
+            module_entity_names = [unique_name(entity) for entity in observers]
+            logger.log(f"Other entities in this module: {module_entity_names}")
         # Execute observers
-        for entity in non_player_entities:
-            logger.log(
-                f"Calling on_player_entered_module of {unique_name(entity)}",
-                LogLevel.VERBOSE,
-            )
+        for entity in observers:
+            if logger.verbose_on:
+                logger.log(
+                    f"Calling on_player_entered_module of {unique_name(entity)}",
+                    LogLevel.VERBOSE,
+                )
             entity.on_player_entered_module()
             # Player could have died in a call to on_player_entered_module so check
             if not self.alive:
                 break
 
     def print_stats(self) -> None:
-        cprint(
+        utils.cprint(
             f"You have {self.flamethrower_fuel} flamethrower fuel and {self._health} health."
         )
 
@@ -269,81 +266,88 @@ class Player(Entity, HasHealth):
 class Telium(Entity):
     ESCAPE_STEPS_RANGE = (1, 3)
 
-    def move_to(self, module: ModuleInterface) -> None:
+    def move_to(self, module: Module) -> None:
         self._set_module(module)
         self.module.telium_visited_recently = True
 
-    def on_player_entered_module(self) -> None:
+    def on_player_entered_module(
+        self, _randint: Callable = randint, _choice: Callable = choice
+    ) -> None:
         escaped = False
-        for _ in range(randint(*self.ESCAPE_STEPS_RANGE)):
-            available_escapes: List[ModuleInterface] = []
-            for module_id in self.module.doors.values():
-                module = ModuleInterface(module_id)
-                if (
-                    module != player.previous_module
-                    and module != player.module
-                    and module != player.locked_module
-                ):
-                    available_escapes.append(module)
+        # The player does not move while the Telium escapes
+        blocked_modules = (player.previous_module, player.module, player.locked_module)
+        for _ in range(_randint(*self.ESCAPE_STEPS_RANGE)):
+            available_escapes: List[Module] = [
+                module
+                for module in self.module.neighbours
+                if module not in blocked_modules
+            ]
             if len(available_escapes) == 0:
                 break
             else:
-                self.move_to(choice(available_escapes))
+                self.move_to(_choice(available_escapes))
                 escaped = True
         # Describe
         if escaped:
-            cprint(get_dialogue("telium_escape"))
+            utils.cprint(get_dialogue("telium_escape"))
         else:
-            cprint("You are confronted by a starfish-like orange mass. It's trapped!")
+            utils.cprint(
+                "You are confronted by a starfish-like orange mass. It's trapped!"
+            )
 
 
 class WorkerAlien(Entity, HasHealth):
-    def __init__(self, initial_module: ModuleInterface) -> None:
+    def __init__(self, initial_module: Module) -> None:
         Entity.__init__(self, initial_module)
         HasHealth.__init__(self, randint(8, 12))
         self.attack = randint(5, 10)
 
+    def _enter_module(self) -> None:
+        Entity._enter_module(self)
+        self.module.hostiles.append(self)
+
+    def _leave_module(self) -> None:
+        Entity._leave_module(self)
+        self.module.hostiles.remove(self)
+
     def on_player_entered_module(self) -> None:
         if self.alive:
-            cprint(
+            utils.cprint(
                 get_dialogue("worker_battle_start").format(
                     determiner="Another"
-                    if any(
-                        not entity.alive
-                        for entity in self.module.entities
-                        if isinstance(entity, WorkerAlien)
-                    )
+                    if any(not alien.alive for alien in self.module.hostiles)
                     else "A"
                 ),
                 colour=Fore.YELLOW,
                 character_delay=0.02,
             )
             while self.alive and player.alive:
-                cprint("How much flamethrower fuel do you use against it?")
+                utils.cprint("How much flamethrower fuel do you use against it?")
                 use_fuel = int_input(">")
                 if use_fuel <= player.flamethrower_fuel:
                     player.flamethrower_fuel -= use_fuel
                     self.hurt(use_fuel)
                     if not self.alive:
                         # If the player kills the alien
-                        cprint(get_dialogue("worker_die"))
+                        utils.cprint(get_dialogue("worker_die"))
                         player.print_stats()
                     elif self._health <= 4:
                         # If the player wounds the alien
-                        cprint(get_dialogue("worker_escape"))
+                        utils.cprint(get_dialogue("worker_escape"))
                         self._set_module(random_module())
-                        logger.log(f"Worker alien escaped to {self.module.title}.")
+                        if logger.info_on:
+                            logger.log(f"Worker alien escaped to {self.module.title}.")
                         break
                     else:
                         # If the alien is not killed yet
-                        cprint(
+                        utils.cprint(
                             "It's not enough! The alien bites you viciously and moves to attack again."
                         )
                         player.hurt(self.attack)
                         if not player.alive:
-                            cprint(get_dialogue("worker_kill_player"))
+                            utils.cprint(get_dialogue("worker_kill_player"))
                 else:
-                    cprint(f"You only have {player.flamethrower_fuel} fuel.")
+                    utils.cprint(f"You only have {player.flamethrower_fuel} fuel.")
 
 
 class SpaceStation:
@@ -351,36 +355,45 @@ class SpaceStation:
         self._energy: int = 100
         self.modules: Dict[str, Module] = {}
         with open(modules_filename, "r", encoding="utf-8") as file:
-            for name, info in json.loads(file.read()).items():
+            for name, info in json.load(file).items():
                 self.modules[name] = Module(
-                    info["title"], info["description"], info["doors"]
+                    name, info["title"], info["description"], info["doors"]
                 )
+        self._link_doors()
+        self.module_choices: Tuple[Module, ...] = tuple(self.modules.values())
+
+    def _link_doors(self) -> None:
+        """Replace the module ids in each module's doors with the modules themselves,
+        and record each module's neighbours."""
+        for module in self.modules.values():
+            module.doors = {
+                direction: self.modules[module_id]
+                for direction, module_id in module.doors.items()
+            }
+            module.neighbours = list(module.doors.values())
+            module.neighbour_set = frozenset(module.neighbours)
 
     def verify_modules_map(self) -> None:
-        for module_id in self.modules:
-            module = ModuleInterface(module_id)
-            for connected_module_id in list(module.doors.values()):
-                if module_id not in list(
-                    ModuleInterface(connected_module_id).doors.values()
-                ):
+        """Log an error for every door that has no door leading back."""
+        for module in self.modules.values():
+            for connected_module in module.neighbours:
+                if module not in connected_module.neighbour_set:
                     logger.log(
-                        f"'{module_id}' is connected to '{connected_module_id}' but not vice versa",
+                        f"'{module.module_id}' is connected to '{connected_module.module_id}' but not vice versa",
                         LogLevel.ERROR,
                     )
 
     def deplete_energy(self, amount: int) -> None:
         """Deplete energy and check if this results in the station running out of energy."""
         # Prevent negative energy.
-        if self._energy - amount > 0:
-            self._energy -= amount
-        else:
-            self._energy = 0
-        logger.log(
-            f"{self} energy depleted by {amount}, now at {self._energy}.",
-            LogLevel.VERBOSE,
-        )
+        self._energy = max(0, self._energy - amount)
+        if logger.verbose_on:
+            logger.log(
+                f"{self} energy depleted by {amount}, now at {self._energy}.",
+                LogLevel.VERBOSE,
+            )
         if self._energy == 0:
-            cprint(
+            utils.cprint(
                 "The lights flicker and turn off. In their place, red emergency lights colours the station."
             )
 
@@ -389,9 +402,13 @@ class SpaceStation:
 entities: List[Entity] = []
 
 # Dialogue
-dialogue: Dict[str, str] = load_dialogue(Language.ENGLISH)
+dialogue: Dict[str, Tuple[str, ...]] = {
+    key: tuple(variations)
+    for key, variations in load_dialogue(Language.ENGLISH).items()
+}
 
 # Configure
+# cprint is called through utils so that disabling text delay rebinds it here too
 # disable_text_delay()
 logger = Logger(LogLevel.VERBOSE)
 
@@ -414,13 +431,15 @@ player.module.visited_by_player = True
 while player.alive:
     command_words = input(">").lower().split()
 
-    if command_words:
-        try:
-            # Execute command, selecting by the first word of the input.
-            command: Callable = available_commands[command_words[0]]
-            command(command_words[1:])
-        except KeyError:
-            cprint('Unrecognised command, enter "commands" to list them.')
-        except IndexError:
-            cprint("Not enough arguments supplied. Correct usage:")
-            cprint(command.__doc__, long_delay=0.02)
+    if not command_words:
+        continue
+    # Execute command, selecting by the first word of the input.
+    command_word = sys.intern(command_words[0])
+    command: Optional[Callable] = available_commands.get(command_word)
+    if command is None:
+        utils.cprint('Unrecognised command, enter "commands" to list them.')
+    elif len(command_words) - 1 < command_num_args[command_word]:
+        utils.cprint("Not enough arguments supplied. Correct usage:")
+        utils.cprint(command.__doc__, long_delay=0.02)
+    else:
+        command(command_words[1:])
@@ -1,9 +1,11 @@
+import atexit
 import json
+import sys
 from enum import Enum
-from glob import glob
+from functools import lru_cache
 from pathlib import Path
 from time import sleep
-from typing import List, Dict
+from typing import List, Dict, Optional, TextIO
 
 from colorama import Fore, Style
 
@@ -30,38 +32,66 @@ log_colours = {
 }
 
 
+@lru_cache(maxsize=None)
 def load_dialogue(language: Language) -> Dict[str, str]:
-    with open(DIALOGUE_FILE, "r") as file:
-        return json.loads(file.read())[language.value]
+    with open(DIALOGUE_FILE, "r", encoding="utf-8") as file:
+        return json.load(file)[language.value]
 
 
 def disable_text_delay():
-    global enable_text_delay
+    """Disable text delay and rebind cprint to print without delay. Call it as
+    utils.cprint to use the rebound version."""
+    global enable_text_delay, cprint
     enable_text_delay = False
+    cprint = _fast_cprint
 
 
 class Logger:
     def __init__(self, level=LogLevel.NONE, save_path=None):
         self.level: LogLevel = level
+        self._threshold: int = level.value
         self.save_path: str = save_path
+        self.run_index: int = 0
+        self.log_path: Optional[str] = None
+        self._log_file: Optional[TextIO] = None
         if save_path is not None:
             Path(save_path).mkdir(exist_ok=True)
-        self.run_index: int = (
-            sorted(
-                [int(Path(path).stem) for path in glob(f"./{save_path}/*.txt")],
-                reverse=True,
-            )[0]
-            + 1
-            if len(glob(f"./{save_path}/*.txt")) > 0
-            else 0
-        )
+            self.run_index = self._next_run_index(save_path)
+            self.log_path = f"{save_path}/{self.run_index}.txt"
+            # Line buffered so each message is saved even if the game crashes
+            self._log_file = open(self.log_path, "a", buffering=1)
+            atexit.register(self._log_file.close)
+        # Checked before building costly messages for the most common levels
+        self.verbose_on: bool = self.enabled(LogLevel.VERBOSE)
+        self.info_on: bool = self.enabled(LogLevel.INFO)
+
+    @staticmethod
+    def _next_run_index(save_path: str) -> int:
+        """Return the index of this run and record it in the save path's index file."""
+        index_file = Path(save_path) / ".index"
+        if index_file.exists():
+            run_index = int(index_file.read_text()) + 1
+        else:
+            # Save paths from before the index file only have the numbered logs
+            run_indices = [
+                int(path.stem)
+                for path in Path(save_path).glob("*.txt")
+                if path.stem.isdigit()
+            ]
+            run_index = max(run_indices, default=-1) + 1
+        index_file.write_text(str(run_index))
+        return run_index
+
+    def enabled(self, level: LogLevel) -> bool:
+        """Whether a message at this level would be printed or saved. Use it to skip
+        building expensive log messages that would be discarded."""
+        return level.value >= self._threshold or self._log_file is not None
 
     def log(self, text: str, level: LogLevel = LogLevel.INFO):
-        if level.value >= self.level.value:
-            print(f"{log_colours[level]}<{level.name}> {text}{Fore.RESET}")
-        if self.save_path is not None:
-            with open(f"{self.save_path}/{self.run_index}.txt", "a") as log_file:
-                log_file.write(f"<{level.name}> {text}\n")
+        if level.value >= self._threshold:
+            print(f"{log_colours.get(level, '')}<{level.name}> {text}{Fore.RESET}")
+        if self._log_file is not None:
+            self._log_file.write(f"<{level.name}> {text}\n")
 
 
 def cprint(
@@ -81,19 +111,32 @@ def cprint(
         long_delay (float, optional): The delay after printing a full stop or semicolon. Defaults to .4.
         end (str, optional): Character to append to the end of the text. Defaults to "\n".
     """
-    print(colour, end="", flush=True)
-    if enable_text_delay:
-        for char in str(text):
-            print(char, end="", flush=True)
-            if char in {".", ";", ":", "?", "!"}:
-                sleep(long_delay)
-            elif char == ",":
-                sleep(short_delay)
-            else:
-                sleep(character_delay)
-        print(end, end=Style.RESET_ALL)
-    else:
-        print(text, end=end + Style.RESET_ALL)
+    if not enable_text_delay:
+        _fast_cprint(text, colour=colour, end=end)
+        return
+    write = sys.stdout.write
+    flush = sys.stdout.flush
+    # Delay after each punctuation character, other characters use character_delay
+    delays = dict.fromkeys(".;:?!", long_delay)
+    delays[","] = short_delay
+    write(colour)
+    for char in str(text):
+        write(char)
+        flush()
+        sleep(delays.get(char, character_delay))
+    write(end + Style.RESET_ALL)
+
+
+def _fast_cprint(
+    text: str,
+    character_delay: float = 0,
+    short_delay: float = 0,
+    long_delay: float = 0,
+    colour: chr = "",
+    end: str = "\n",
+):
+    """cprint without any delay, the delay arguments are ignored."""
+    sys.stdout.write(f"{colour}{text}{end}{Style.RESET_ALL if colour else ''}")
 
 
 def sent_concat(words: List[str]) -> str:
@@ -106,9 +149,11 @@ def sent_concat(words: List[str]) -> str:
         str: Words concatenated into a sentence.
     """
     length: int = len(words)
-    if length > 1:
-        words[length - 1] = "and " + words[length - 1]
-    return ", ".join(words) if length > 2 else " ".join(words)
+    if length < 2:
+        return "".join(words)
+    if length == 2:
+        return f"{words[0]} and {words[1]}"
+    return f"{', '.join(words[:-1])}, and {words[-1]}"
 
 
 def yes_or_no(question, default: bool = False) -> bool: